@@ -0,0 +1,184 @@
+"""
+Compare TLS handshake rates against a local nginx for the old server block
+(listen 443 ssl + cert/key only) and the one produced by generate_nginx_config().
+
+Usage: python bench/tls_handshake.py [--seconds 10] [--port 18443] [--nginx /usr/sbin/nginx]
+
+The client reconnects in a loop and offers the previous session each time,
+the way browsers do, so the numbers show how often nginx lets it resume.
+OCSP stapling is not exercised: the bench certificate is self-signed.
+"""
+import argparse
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import yaml
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DOMAIN = "bench.localhost"
+
+NGINX_CONF = """worker_processes 1;
+pid {prefix}/nginx.pid;
+error_log {prefix}/error.log;
+events {{}}
+http {{
+    access_log off;
+    client_body_temp_path {prefix}/body;
+    proxy_temp_path {prefix}/proxy;
+    fastcgi_temp_path {prefix}/fastcgi;
+    uwsgi_temp_path {prefix}/uwsgi;
+    scgi_temp_path {prefix}/scgi;
+    include {conf_dir}/*.conf;
+}}
+"""
+
+
+def write_self_signed(cert_dir):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, DOMAIN)])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=30))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(DOMAIN)]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    with open(os.path.join(cert_dir, f"{DOMAIN}.crt"), "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(os.path.join(cert_dir, f"{DOMAIN}.key"), "wb") as f:
+        f.write(key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+
+
+def baseline_config(cert_dir):
+    """Server block as generated before shared TLS settings were added."""
+    cert_path = os.path.join(cert_dir, f"{DOMAIN}.crt")
+    key_path = os.path.join(cert_dir, f"{DOMAIN}.key")
+    return f"""server {{
+    listen 80;
+    server_name {DOMAIN};
+    location ^~ / {{
+        return 204;
+    }}
+
+    listen 443 ssl;
+    ssl_certificate {cert_path};
+    ssl_certificate_key {key_path};
+}}
+"""
+
+
+def run_client(port, seconds):
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    session = None
+    handshakes = resumed = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        with socket.create_connection(("127.0.0.1", port)) as raw:
+            with ctx.wrap_socket(raw, server_hostname=DOMAIN, session=session) as sock:
+                # TLS 1.3 tickets arrive after the handshake, so read a response
+                sock.sendall(f"HEAD / HTTP/1.1\r\nHost: {DOMAIN}\r\nConnection: close\r\n\r\n".encode())
+                while sock.recv(4096):
+                    pass
+                handshakes += 1
+                resumed += sock.session_reused
+                session = sock.session
+    return handshakes, resumed
+
+
+def bench(nginx_bin, prefix, conf_dir, config, http_port, https_port, seconds):
+    config = config.replace("listen 443 ssl;", f"listen {https_port} ssl;")
+    config = config.replace("listen 80;", f"listen {http_port};")
+    # Answer locally so the numbers measure TLS, not the upstream
+    config = config.replace("proxy_pass http://127.0.0.1:1;", "return 204;")
+    for filename in os.listdir(conf_dir):
+        if filename.endswith(".conf"):
+            os.remove(os.path.join(conf_dir, filename))
+    with open(os.path.join(conf_dir, f"{DOMAIN}.conf"), "w") as f:
+        f.write(config)
+
+    conf_path = os.path.join(prefix, "nginx.conf")
+    proc = subprocess.Popen([nginx_bin, "-p", prefix, "-c", conf_path, "-g", "daemon off;"])
+    try:
+        deadline = time.time() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", https_port), timeout=0.2).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"nginx did not start, see {prefix}/error.log")
+                time.sleep(0.1)
+        return run_client(https_port, seconds)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--nginx", default="/usr/sbin/nginx")
+    args = parser.parse_args()
+
+    prefix = tempfile.mkdtemp(prefix="webfront-bench-")
+    cert_dir = os.path.join(prefix, "certs")
+    conf_dir = os.path.join(prefix, "conf.d")
+    for d in (cert_dir, conf_dir, *(os.path.join(prefix, t) for t in ("body", "proxy", "fastcgi", "uwsgi", "scgi"))):
+        os.makedirs(d)
+    write_self_signed(cert_dir)
+    with open(os.path.join(prefix, "nginx.conf"), "w") as f:
+        f.write(NGINX_CONF.format(prefix=prefix, conf_dir=conf_dir))
+
+    # config and datastore read config.yaml and sites.json from the working directory
+    os.chdir(prefix)
+    with open("config.yaml", "w") as f:
+        yaml.dump({"NGX_CERT_DIR": cert_dir, "NGX_CONF_DIR": conf_dir, "CF_ZONE_ID_MAP": {}}, f)
+    with open("sites.json", "w") as f:
+        f.write("[]")
+    sys.path.insert(0, SRC_DIR)
+    import datastore
+    import nginx
+
+    site = datastore.create_site(datastore.SitePayload(
+        domain=DOMAIN, ssl=True, proxy_pass="http://127.0.0.1:1", ssl_redirect=False, hsts=True,
+    ))
+    nginx.generate_tls_settings()
+    variants = {
+        "before": baseline_config(cert_dir),
+        "after": nginx.generate_nginx_config(site.id),
+    }
+
+    http_port = args.port + 1
+    for label, config in variants.items():
+        handshakes, resumed = bench(args.nginx, prefix, conf_dir, config, http_port, args.port, args.seconds)
+        print(
+            f"{label:>6}: {handshakes / args.seconds:8.1f} handshakes/s, "
+            f"{resumed}/{handshakes} resumed ({100 * resumed / max(handshakes, 1):.1f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
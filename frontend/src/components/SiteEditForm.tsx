@@ -30,6 +30,8 @@ export default function SiteEditForm({ siteId, onBack, onSave }: SiteEditFormPro
     ssl_provider: '',
     proxy_pass: '',
     proxy_headers: {},
+    ssl_redirect: false,
+    hsts: false,
   });
   const [proxyHeaders, setProxyHeaders] = useState<{ key: string; value: string }[]>([]);
 
@@ -43,6 +45,8 @@ export default function SiteEditForm({ siteId, onBack, onSave }: SiteEditFormPro
         ssl_provider: '',
         proxy_pass: '',
         proxy_headers: {},
+        ssl_redirect: false,
+        hsts: false,
       });
       setProxyHeaders([]);
     }
@@ -59,6 +63,8 @@ export default function SiteEditForm({ siteId, onBack, onSave }: SiteEditFormPro
         ssl_provider: site.ssl_provider,
         proxy_pass: site.proxy_pass,
         proxy_headers: site.proxy_headers,
+        ssl_redirect: site.ssl_redirect,
+        hsts: site.hsts,
       });
       setProxyHeaders(
         Object.entries(site.proxy_headers).map(([key, value]) => ({ key, value }))
@@ -169,6 +175,29 @@ export default function SiteEditForm({ siteId, onBack, onSave }: SiteEditFormPro
               </Grid>
             )}
 
+            {formData.ssl && (
+              <Grid item xs={12}>
+                <FormControlLabel
+                  control={
+                    <Switch
+                      checked={formData.ssl_redirect}
+                      onChange={(e) => setFormData({ ...formData, ssl_redirect: e.target.checked })}
+                    />
+                  }
+                  label="Redirect HTTP to HTTPS"
+                />
+                <FormControlLabel
+                  control={
+                    <Switch
+                      checked={formData.hsts}
+                      onChange={(e) => setFormData({ ...formData, hsts: e.target.checked })}
+                    />
+                  }
+                  label="Enable HSTS"
+                />
+              </Grid>
+            )}
+
             <Grid item xs={12}>
               <TextField
                 fullWidth
@@ -5,6 +5,8 @@ export interface Site {
   ssl_provider: string;
   proxy_pass: string;
   proxy_headers: Record<string, string>;
+  ssl_redirect: boolean;
+  hsts: boolean;
 }
 
 export interface SitePayload {
@@ -13,5 +15,7 @@ export interface SitePayload {
   ssl_provider: string;
   proxy_pass: string;
   proxy_headers: Record<string, string>;
+  ssl_redirect: boolean;
+  hsts: boolean;
 }
 
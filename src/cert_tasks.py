@@ -1,6 +1,7 @@
 from threading import Lock
 import time
 from zero_ssl import get_cert_for_domains
+from cloudflare_dns import CloudflareDNS
 from config import NGX_CERT_DIR, CF_ZONE_ID_MAP
 import os
 from nginx import reload_nginx, generate_all_configs
@@ -9,9 +10,11 @@ from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from datetime import datetime, timedelta
 from datastore import list_sites
+from ocsp import REFRESH_INTERVAL, discard_ocsp_response, fetch_ocsp_response, has_valid_response, refresh_ocsp_responses
 
 task_queue = []
 queue_lock = Lock()
+dns_manager = CloudflareDNS(CF_ZONE_ID_MAP)
 
 def add_cert_task(domain):
     with queue_lock:
@@ -38,7 +41,7 @@ def execute_cert_tasks():
                     continue
                 print(f"Generating certificate for {domain}")
                 domains = [domain.strip()]
-                cert_data = get_cert_for_domains(domains, CF_ZONE_ID_MAP)
+                cert_data = get_cert_for_domains(domains, dns_manager)
                 print(f"Got cert data:", cert_data)
                 cert = cert_data.get("certificate", "")
                 ca_bundle = cert_data.get("ca_bundle", "")
@@ -56,6 +59,12 @@ def execute_cert_tasks():
                     with open(key_path, "w") as key_file:
                         key_file.write(key)
                     print(f"Certificate for {domain} saved successfully (with CA bundle)")
+                    # The old OCSP response belongs to the previous certificate
+                    discard_ocsp_response(domain)
+                    try:
+                        fetch_ocsp_response(domain)
+                    except Exception as e:
+                        print(f"Failed to fetch OCSP response for {domain}: {e}")
                     generate_all_configs()
                     reload_nginx()
                 else:
@@ -76,8 +85,29 @@ def check_for_cert_expiry():
         time.sleep(24 * 3600)  # Check once a day
 
 
+def _stapled_domains(domains):
+    return {domain for domain in domains if has_valid_response(domain)}
+
+
+def refresh_ocsp():
+    # The running nginx config may predate this process, so always reconcile once
+    stapled = None
+    while True:
+        domains = [site.domain for site in list_sites() if site.ssl]
+        changed = refresh_ocsp_responses(domains)
+        # Regenerate on new responses and when an expired one must be dropped
+        now_stapled = _stapled_domains(domains)
+        if changed or now_stapled != stapled:
+            generate_all_configs()
+            reload_nginx()
+        stapled = now_stapled
+        time.sleep(REFRESH_INTERVAL.total_seconds())
+
+
 def start_cert_renewal_task():
     cert_thread = threading.Thread(target=execute_cert_tasks, daemon=True)
     cert_thread.start()
     expiry_thread = threading.Thread(target=check_for_cert_expiry, daemon=True)
-    expiry_thread.start()
\ No newline at end of file
+    expiry_thread.start()
+    ocsp_thread = threading.Thread(target=refresh_ocsp, daemon=True)
+    ocsp_thread.start()
\ No newline at end of file
@@ -0,0 +1,193 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+
+import requests
+from dotenv import load_dotenv
+
+# Load .env credentials
+load_dotenv()
+
+CLOUDFLARE_API_TOKEN = os.getenv("CLOUDFLARE_API_TOKEN")
+CLOUDFLARE_API_URL = "https://api.cloudflare.com/client/v4"
+
+VALIDATION_TTL = 120
+MAX_WORKERS = 8
+# Cloudflare's "No route for that URI" error, returned when an endpoint does not exist
+ROUTE_MISSING_CODES = {7000}
+
+
+def _headers():
+    return {
+        "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
+        "Content-Type": "application/json",
+    }
+
+
+def _normalize(name: str) -> str:
+    return name.strip().rstrip(".").lower()
+
+
+def _error_codes(resp) -> set[int]:
+    try:
+        return {e.get("code") for e in resp.json().get("errors") or []}
+    except ValueError:
+        return set()
+
+
+def _check(resp):
+    resp.raise_for_status()
+    data = resp.json()
+    if not data.get("success"):
+        raise Exception(f"Cloudflare DNS error: {data}")
+    return data
+
+
+class CloudflareDNS:
+    """Manage ZeroSSL CNAME validation records across Cloudflare zones."""
+
+    def __init__(self, zone_id_mapping: dict[str, str]):
+        self.zone_id_mapping = {_normalize(k): v for k, v in zone_id_mapping.items()}
+        self._zone_cache: dict[str, str] = {}
+        self._batch_supported = True
+        self._lock = Lock()
+
+    def zone_for_host(self, host: str) -> str:
+        """Resolve the zone id for a host by longest suffix match."""
+        host = _normalize(host)
+        with self._lock:
+            if host in self._zone_cache:
+                return self._zone_cache[host]
+            labels = host.split(".")
+            for i in range(len(labels)):
+                suffix = ".".join(labels[i:])
+                if suffix in self.zone_id_mapping:
+                    self._zone_cache[host] = self.zone_id_mapping[suffix]
+                    return self._zone_cache[host]
+        raise KeyError(f"No Cloudflare zone configured for {host}")
+
+    def list_cname_records(self, zone_id: str) -> dict[str, dict]:
+        """Return the zone's `_`-prefixed CNAME records keyed by name."""
+        url = f"{CLOUDFLARE_API_URL}/zones/{zone_id}/dns_records"
+        records = {}
+        page = 1
+        while True:
+            params = {
+                "type": "CNAME",
+                "name.startswith": "_",
+                "per_page": 1000,
+                "page": page,
+            }
+            data = _check(requests.get(url, params=params, headers=_headers()))
+            for record in data["result"]:
+                records[_normalize(record["name"])] = record
+            info = data.get("result_info") or {}
+            if page >= info.get("total_pages", 1):
+                return records
+            page += 1
+
+    def upsert_cname_records(self, records: list[tuple[str, str, str]], created: list[tuple[str, str]]) -> None:
+        """
+        Create or update CNAME records given as (host, name, target).
+        Records that already point at the right target are reused as is.
+        (zone_id, record_id) pairs are appended to the caller's `created`
+        list as they land, so it can clean them up even after a partial
+        failure.
+        """
+        by_zone: dict[str, list[tuple[str, str]]] = {}
+        for host, name, target in records:
+            by_zone.setdefault(self.zone_for_host(host), []).append((name, target))
+
+        for zone_id, wanted in by_zone.items():
+            existing = self.list_cname_records(zone_id)
+            posts, patches = [], []
+            for name, target in wanted:
+                record = existing.get(_normalize(name))
+                if record is None:
+                    posts.append({
+                        "type": "CNAME",
+                        "name": name,
+                        "content": target,
+                        "ttl": VALIDATION_TTL,
+                        "proxied": False,
+                    })
+                elif _normalize(record["content"]) != _normalize(target):
+                    patches.append({"id": record["id"], "content": target})
+                else:
+                    print(f"[+] Reusing Cloudflare CNAME: {name} -> {target}")
+                    created.append((zone_id, record["id"]))
+
+            if posts or patches:
+                for record in self._apply(zone_id, posts=posts, patches=patches, created=created):
+                    print(f"[+] Upserted Cloudflare CNAME: {record['name']} -> {record['content']}")
+
+    def delete_records(self, records: list[tuple[str, str]]) -> None:
+        """Delete (zone_id, record_id) pairs collected by upsert_cname_records."""
+        by_zone: dict[str, list[str]] = {}
+        for zone_id, record_id in records:
+            by_zone.setdefault(zone_id, []).append(record_id)
+        errors = []
+        for zone_id, record_ids in by_zone.items():
+            try:
+                self._apply(zone_id, deletes=[{"id": i} for i in record_ids])
+            except Exception as e:
+                errors.append(e)
+                continue
+            print(f"[+] Removed {len(record_ids)} Cloudflare validation record(s) from zone {zone_id}")
+        if errors:
+            raise Exception(f"Cloudflare DNS cleanup failed: {errors}")
+
+    def _apply(self, zone_id, posts=(), patches=(), deletes=(), created=None) -> list[dict]:
+        created = created if created is not None else []
+        if self._batch_supported:
+            try:
+                records = self._apply_batch(zone_id, posts, patches, deletes)
+                created.extend((zone_id, r["id"]) for r in records)
+                return records
+            except requests.HTTPError as e:
+                # Only a missing route means no batch support; a 404 for a
+                # record named in the batch must surface as a normal error
+                if e.response is None or not (
+                    e.response.status_code == 405
+                    or (e.response.status_code == 404 and _error_codes(e.response) & ROUTE_MISSING_CODES)
+                ):
+                    raise
+                print("[+] Cloudflare batch endpoint unavailable, falling back to concurrent requests")
+                self._batch_supported = False
+        return self._apply_concurrent(zone_id, posts, patches, deletes, created)
+
+    def _apply_batch(self, zone_id, posts, patches, deletes) -> list[dict]:
+        url = f"{CLOUDFLARE_API_URL}/zones/{zone_id}/dns_records/batch"
+        body = {"posts": list(posts), "patches": list(patches), "deletes": list(deletes)}
+        data = _check(requests.post(url, json=body, headers=_headers()))
+        result = data.get("result") or {}
+        return result.get("posts", []) + result.get("patches", [])
+
+    def _apply_concurrent(self, zone_id, posts, patches, deletes, created) -> list[dict]:
+        url = f"{CLOUDFLARE_API_URL}/zones/{zone_id}/dns_records"
+
+        def post(body):
+            record = _check(requests.post(url, json=body, headers=_headers()))["result"]
+            created.append((zone_id, record["id"]))
+            return record
+
+        def patch(body):
+            record_url = f"{url}/{body['id']}"
+            payload = {k: v for k, v in body.items() if k != "id"}
+            record = _check(requests.patch(record_url, json=payload, headers=_headers()))["result"]
+            created.append((zone_id, record["id"]))
+            return record
+
+        def delete(body):
+            _check(requests.delete(f"{url}/{body['id']}", headers=_headers()))
+            return None
+
+        jobs = [(post, b) for b in posts] + [(patch, b) for b in patches] + [(delete, b) for b in deletes]
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs))) as pool:
+            futures = [pool.submit(fn, body) for fn, body in jobs]
+            # Wait for every job so `created` is complete before any error propagates
+            wait(futures)
+            results = [f.result() for f in futures]
+        return [r for r in results if r is not None]
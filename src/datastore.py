@@ -11,6 +11,8 @@ class SiteConfig(BaseModel):
     ssl_provider: str
     proxy_pass: str
     proxy_headers: dict[str, str]
+    ssl_redirect: bool = False
+    hsts: bool = False
 
 
 class SitePayload(BaseModel):
@@ -19,6 +21,8 @@ class SitePayload(BaseModel):
     ssl_provider: str = ""
     proxy_pass: str = ""
     proxy_headers: dict[str, str] = {}
+    ssl_redirect: bool = False
+    hsts: bool = False
 
 
 # Local JSON store provider
@@ -1,9 +1,29 @@
 import datastore
 import os
 import subprocess
+from threading import RLock
 from config import NGX_CERT_DIR, NGX_CONF_DIR
+from ocsp import has_valid_response, ocsp_path
 import traceback
 
+TLS_SETTINGS_PATH = os.path.join(NGX_CONF_DIR, "webfront-tls.inc")
+
+# Shared across all SSL server blocks so sessions resume between reconnects
+TLS_SETTINGS = """ssl_protocols TLSv1.2 TLSv1.3;
+ssl_ciphers ECDHE-ECDSA-AES128-GCM-SHA256:ECDHE-RSA-AES128-GCM-SHA256:ECDHE-ECDSA-AES256-GCM-SHA384:ECDHE-RSA-AES256-GCM-SHA384:ECDHE-ECDSA-CHACHA20-POLY1305:ECDHE-RSA-CHACHA20-POLY1305;
+ssl_prefer_server_ciphers off;
+ssl_ecdh_curve X25519:prime256v1:secp384r1;
+ssl_session_cache shared:webfront_ssl:10m;
+ssl_session_timeout 1d;
+ssl_session_tickets on;
+"""
+
+HSTS_HEADER = 'add_header Strict-Transport-Security "max-age=63072000" always;'
+
+# Site changes, certificate renewals and OCSP refreshes regenerate configs
+# from different threads; clear_configs() must not race another writer.
+config_lock = RLock()
+
 def generate_nginx_config(site_id):
     site = datastore.get_site(site_id)
     if not site:
@@ -21,27 +41,62 @@ def generate_nginx_config(site_id):
     
     headers = "".join([f'proxy_set_header {k} {v};\n        ' for k, v in proxy_header.items()])
 
-    config = f"""server {{
-    listen 80;
-    server_name {site.domain};
-    location ^~ / {{
+    location = f"""    location ^~ / {{
         proxy_pass {site.proxy_pass};
         {headers}
         proxy_buffering off;
         proxy_request_buffering off;
     }}
 """
-    if site.ssl:
-        cert_path = os.path.join(NGX_CERT_DIR, f"{site.domain}.crt")
-        key_path = os.path.join(NGX_CERT_DIR, f"{site.domain}.key")
-        if os.path.exists(cert_path) and os.path.exists(key_path):
-            config += f"""
-    listen 443 ssl;
+
+    cert_path = os.path.join(NGX_CERT_DIR, f"{site.domain}.crt")
+    key_path = os.path.join(NGX_CERT_DIR, f"{site.domain}.key")
+    ssl_ready = site.ssl and os.path.exists(cert_path) and os.path.exists(key_path)
+    if not ssl_ready:
+        return f"""server {{
+    listen 80;
+    server_name {site.domain};
+{location}}}
+"""
+
+    ssl_config = f"""    listen 443 ssl;
     ssl_certificate {cert_path};
     ssl_certificate_key {key_path};
+    include {TLS_SETTINGS_PATH};
+"""
+    if has_valid_response(site.domain):
+        ssl_config += f"""    ssl_stapling on;
+    ssl_stapling_file {ocsp_path(site.domain)};
 """
-    config += "}\n"
-    return config
+    if site.hsts:
+        ssl_config += f"    {HSTS_HEADER}\n"
+
+    if not site.ssl_redirect and not site.hsts:
+        return f"""server {{
+    listen 80;
+    server_name {site.domain};
+{ssl_config}{location}}}
+"""
+
+    # Separate blocks so HSTS is only sent over HTTPS (RFC 6797 section 7.2)
+    if site.ssl_redirect:
+        http_body = "    return 301 https://$host$request_uri;\n"
+    else:
+        http_body = location
+    return f"""server {{
+    listen 80;
+    server_name {site.domain};
+{http_body}}}
+
+server {{
+    server_name {site.domain};
+{ssl_config}{location}}}
+"""
+
+
+def generate_tls_settings():
+    with open(TLS_SETTINGS_PATH, "w") as f:
+        f.write(TLS_SETTINGS)
 
 
 def clear_configs():
@@ -51,12 +106,14 @@ def clear_configs():
 
 
 def generate_all_configs():
-    clear_configs()
-    sites = datastore.list_sites()
-    for site in sites:
-        config = generate_nginx_config(site.id)
-        with open(os.path.join(NGX_CONF_DIR, f"{site.domain}.conf"), "w") as f:
-            f.write(config)
+    with config_lock:
+        clear_configs()
+        generate_tls_settings()
+        sites = datastore.list_sites()
+        for site in sites:
+            config = generate_nginx_config(site.id)
+            with open(os.path.join(NGX_CONF_DIR, f"{site.domain}.conf"), "w") as f:
+                f.write(config)
 
 
 def _run_command(cmd, timeout=10):
@@ -68,8 +125,9 @@ def _run_command(cmd, timeout=10):
 
 def reload_nginx():
     try:
-        _run_command(["/usr/sbin/nginx", "-t"])
-        _run_command(["/usr/sbin/nginx", "-s", "reload"])
+        with config_lock:
+            _run_command(["/usr/sbin/nginx", "-t"])
+            _run_command(["/usr/sbin/nginx", "-s", "reload"])
         return True
     except Exception as e:
         print(f"Failed to reload nginx: {e}")
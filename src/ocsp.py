@@ -0,0 +1,233 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+
+import requests
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+from cryptography.x509 import ocsp
+from cryptography.x509.oid import AuthorityInformationAccessOID, ExtendedKeyUsageOID, ExtensionOID
+
+from config import NGX_CERT_DIR
+
+REFRESH_BEFORE = timedelta(days=2)
+# How often cert_tasks re-checks responses. nginx staples whatever is in
+# ssl_stapling_file without checking expiry, so a response is only used
+# while it will outlive the next check.
+REFRESH_INTERVAL = timedelta(hours=6)
+# Baseline Requirements cap OCSP validity at 10 days; anything longer is suspect
+MAX_RESPONSE_VALIDITY = timedelta(days=10)
+CLOCK_SKEW = timedelta(minutes=5)
+
+# Held while a response is fetched or discarded so that a refresh that read
+# the previous certificate cannot store its response after a renewal.
+_response_lock = Lock()
+
+
+def ocsp_path(domain: str) -> str:
+    return os.path.join(NGX_CERT_DIR, f"{domain}.ocsp")
+
+
+def _load_chain(cert_path):
+    with open(cert_path, "rb") as f:
+        return x509.load_pem_x509_certificates(f.read())
+
+
+def _find_issuer(cert, chain):
+    """Return the chain certificate that issued `cert`, wherever it sits in the bundle."""
+    for candidate in chain:
+        if candidate is not cert and candidate.subject == cert.issuer:
+            return candidate
+    return None
+
+
+def _load_leaf_and_issuer(domain):
+    cert_path = os.path.join(NGX_CERT_DIR, f"{domain}.crt")
+    if not os.path.exists(cert_path):
+        return None, None
+    chain = _load_chain(cert_path)
+    return chain[0], _find_issuer(chain[0], chain[1:])
+
+
+def _responder_url(cert):
+    try:
+        aia = cert.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_INFORMATION_ACCESS).value
+    except x509.ExtensionNotFound:
+        return None
+    for desc in aia:
+        if desc.access_method == AuthorityInformationAccessOID.OCSP:
+            return desc.access_location.value
+    return None
+
+
+def _signed_by(ocsp_resp, signer) -> bool:
+    public_key = signer.public_key()
+    data, signature = ocsp_resp.tbs_response_bytes, ocsp_resp.signature
+    hash_algorithm = ocsp_resp.signature_hash_algorithm
+    try:
+        if isinstance(public_key, rsa.RSAPublicKey):
+            public_key.verify(signature, data, padding.PKCS1v15(), hash_algorithm)
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            public_key.verify(signature, data, ec.ECDSA(hash_algorithm))
+        else:
+            public_key.verify(signature, data)
+    except (InvalidSignature, TypeError, ValueError):
+        return False
+    return True
+
+
+def _is_delegated_responder(responder, issuer, now) -> bool:
+    """A responder certificate issued by `issuer` for OCSP signing and currently valid."""
+    if responder.issuer != issuer.subject:
+        return False
+    try:
+        responder.verify_directly_issued_by(issuer)
+        eku = responder.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+    except (InvalidSignature, TypeError, ValueError, x509.ExtensionNotFound):
+        return False
+    return (
+        ExtendedKeyUsageOID.OCSP_SIGNING in eku
+        and responder.not_valid_before_utc <= now <= responder.not_valid_after_utc
+    )
+
+
+def _verify_response(ocsp_resp, cert, issuer):
+    """
+    Raise unless the response is a good, signed, current answer for `cert`.
+    nginx staples ssl_stapling_file as is, so nothing unverified may be written.
+    """
+    if ocsp_resp.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+        raise Exception(f"OCSP responder error: {ocsp_resp.response_status}")
+    if ocsp_resp.certificate_status != ocsp.OCSPCertStatus.GOOD:
+        raise Exception(f"OCSP certificate status: {ocsp_resp.certificate_status}")
+
+    # Make sure the response is for this certificate, not one from before a renewal
+    req = ocsp.OCSPRequestBuilder().add_certificate(cert, issuer, ocsp_resp.hash_algorithm).build()
+    if (
+        ocsp_resp.serial_number != cert.serial_number
+        or ocsp_resp.issuer_name_hash != req.issuer_name_hash
+        or ocsp_resp.issuer_key_hash != req.issuer_key_hash
+    ):
+        raise Exception("OCSP response does not match the certificate")
+
+    now = datetime.now(timezone.utc)
+    signers = [issuer] + [r for r in ocsp_resp.certificates if _is_delegated_responder(r, issuer, now)]
+    if not any(_signed_by(ocsp_resp, signer) for signer in signers):
+        raise Exception("OCSP response signature is not from the issuer or its delegated responder")
+
+    this_update, next_update = ocsp_resp.this_update_utc, ocsp_resp.next_update_utc
+    if this_update > now + CLOCK_SKEW:
+        raise Exception(f"OCSP response is not yet valid: {this_update}")
+    if next_update is None or next_update <= now:
+        raise Exception(f"OCSP response has expired: {next_update}")
+    if next_update - this_update > MAX_RESPONSE_VALIDITY:
+        raise Exception(f"OCSP response validity is too long: {this_update} to {next_update}")
+
+
+def _load_response(domain):
+    """Return the stored response if it still verifies against the current certificate."""
+    path = ocsp_path(domain)
+    if not os.path.exists(path):
+        return None
+    try:
+        cert, issuer = _load_leaf_and_issuer(domain)
+        if issuer is None:
+            return None
+        with open(path, "rb") as f:
+            resp = ocsp.load_der_ocsp_response(f.read())
+        _verify_response(resp, cert, issuer)
+    except Exception as e:
+        print(f"Ignoring stored OCSP response for {domain}: {e}")
+        return None
+    return resp
+
+
+def _time_left(domain):
+    resp = _load_response(domain)
+    if resp is None or resp.next_update_utc is None:
+        return None
+    return resp.next_update_utc - datetime.now(timezone.utc)
+
+
+def has_valid_response(domain: str) -> bool:
+    """Return True if a stored OCSP response exists and stays valid until the next check."""
+    left = _time_left(domain)
+    return left is not None and left > REFRESH_INTERVAL
+
+
+def needs_refresh(domain: str) -> bool:
+    """Return True if the stored OCSP response is missing or close to its next update."""
+    left = _time_left(domain)
+    return left is None or left < REFRESH_BEFORE
+
+
+def discard_ocsp_response(domain: str) -> None:
+    """Remove the stored OCSP response, e.g. after the certificate was replaced."""
+    with _response_lock:
+        if os.path.exists(ocsp_path(domain)):
+            os.remove(ocsp_path(domain))
+
+
+def fetch_ocsp_response(domain: str) -> bool:
+    """
+    Fetch an OCSP response for the domain's certificate and store it as
+    <domain>.ocsp next to the certificate for ssl_stapling_file.
+    Returns True if a fresh response was written.
+    """
+    with _response_lock:
+        return _fetch_ocsp_response(domain)
+
+
+def _fetch_ocsp_response(domain):
+    cert, issuer = _load_leaf_and_issuer(domain)
+    if cert is None:
+        return False
+    if issuer is None:
+        print(f"[+] No issuer in chain for {domain}, skipping OCSP")
+        return False
+
+    url = _responder_url(cert)
+    if not url:
+        print(f"[+] No OCSP responder for {domain}, skipping OCSP")
+        return False
+
+    req = ocsp.OCSPRequestBuilder().add_certificate(cert, issuer, hashes.SHA1()).build()
+    resp = requests.post(
+        url,
+        data=req.public_bytes(serialization.Encoding.DER),
+        headers={"Content-Type": "application/ocsp-request"},
+        timeout=10,
+    )
+    resp.raise_for_status()
+
+    ocsp_resp = ocsp.load_der_ocsp_response(resp.content)
+    _verify_response(ocsp_resp, cert, issuer)
+
+    # Write atomically so nginx never loads a partial response
+    path = ocsp_path(domain)
+    fd, tmp_path = tempfile.mkstemp(dir=NGX_CERT_DIR, prefix=f".{domain}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    print(f"[+] OCSP response for {domain} saved, next update {ocsp_resp.next_update_utc}")
+    return True
+
+
+def refresh_ocsp_responses(domains: list[str]) -> bool:
+    """Refresh stale OCSP responses. Returns True if any response changed."""
+    changed = False
+    for domain in domains:
+        if not needs_refresh(domain):
+            continue
+        try:
+            changed = fetch_ocsp_response(domain) or changed
+        except Exception as e:
+            print(f"Failed to fetch OCSP response for {domain}: {e}")
+    return changed
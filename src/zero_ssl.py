@@ -7,12 +7,12 @@ from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import rsa
 
+from cloudflare_dns import CloudflareDNS
+
 # Load .env credentials
 load_dotenv()
 
 ZEROSSL_API_KEY = os.getenv("ZEROSSL_API_KEY")
-CLOUDFLARE_API_TOKEN = os.getenv("CLOUDFLARE_API_TOKEN")
-CLOUDFLARE_API_EMAIL = os.getenv("CLOUDFLARE_API_EMAIL")
 
 
 def generate_csr(domains: list[str]) -> str:
@@ -75,31 +75,6 @@ def create_certificate(domains: list[str]):
     return data["id"], data["validation"], private_key
 
 
-def create_cloudflare_cname(zone_id, name, target):
-    """Create a CNAME record in Cloudflare DNS."""
-    url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records"
-    headers = {
-        "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "type": "CNAME",
-        "name": name,
-        "content": target,
-        "ttl": 120,
-        "proxied": False,
-    }
-
-    resp = requests.post(url, json=body, headers=headers)
-    resp.raise_for_status()
-    data = resp.json()
-
-    if not data.get("success"):
-        raise Exception(f"Cloudflare DNS error: {data}")
-
-    return data["result"]["id"]
-
-
 def start_validation(cert_id):
     """Create a CNAME record in Cloudflare DNS."""
     url = (
@@ -180,24 +155,32 @@ def get_pem_bundle(cert_id):
         }
 
 
-def get_cert_for_domains(domains: list[str], zone_id_mapping: dict[str, str]) -> dict:
-    """Get certificate for given domains and cloudflare zone id."""
+def get_cert_for_domains(domains: list[str], dns: CloudflareDNS) -> dict:
+    """Get certificate for given domains, validating through Cloudflare DNS."""
     cert_id, validation, private_key = create_certificate(domains)
     print(f"[+] Created certificate id: {cert_id}")
 
-    # Create CNAME records
-    for host, info in validation["other_methods"].items():
-        cname_name = info["cname_validation_p1"]
-        cname_target = info["cname_validation_p2"]
-        domain_base = ".".join(host.split(".")[-2:])
-
-        print(f"[+] Adding Cloudflare CNAME: {cname_name} -> {cname_target}")
-        create_cloudflare_cname(zone_id_mapping[domain_base], cname_name, cname_target)
-
-    print("[+] Waiting for DNS propagation and validation...")
-    poll_certificate_status(cert_id)
-
-    print("[+] Certificate issued. Fetching PEM bundle...")
+    # Create or reuse CNAME records
+    records = [
+        (host, info["cname_validation_p1"], info["cname_validation_p2"])
+        for host, info in validation["other_methods"].items()
+    ]
+    validation_records = []
+    try:
+        dns.upsert_cname_records(records, validation_records)
+
+        print("[+] Waiting for DNS propagation and validation...")
+        poll_certificate_status(cert_id)
+        print("[+] Certificate issued.")
+    finally:
+        # Each attempt uses a fresh CSR hash, so leftover records are never reused
+        print("[+] Removing validation records...")
+        try:
+            dns.delete_records(validation_records)
+        except Exception as e:
+            print(f"[!] Failed to remove validation records: {e}")
+
+    print("[+] Fetching PEM bundle...")
     return {
         **get_pem_bundle(cert_id),
         "private_key": private_key,
@@ -207,9 +190,9 @@ def get_cert_for_domains(domains: list[str], zone_id_mapping: dict[str, str]) ->
 if __name__ == "__main__":
     # Example usage
     # domains = ["example.com", "www.example.com"]
-    # zone_id_mapping = {
-    # }
-    # cert_data = get_cert_for_domains(domains, zone_id_mapping)
+    # dns = CloudflareDNS({
+    # })
+    # cert_data = get_cert_for_domains(domains, dns)
     # print(cert_data)
     print(get_pem_bundle(""))
     # print(get_certificate(""))
\ No newline at end of file